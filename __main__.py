@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+import sys
 import os
 
-from environments import *
-from workloads import *
-from commands import *
-from utils import *
+from commands import COMMAND_INDEX, load_command
+from utils import ProgramError, print_error, print_warning
 
 
 def main():
@@ -18,7 +17,15 @@ def main():
     )
     subparsers = parser.add_subparsers(dest="command", required=True, help="Available commands")
 
-    for name, cls in BaseCommand.registry.items():
+    # Only the requested subcommand's module is imported and built; the rest
+    # are registered as bare parsers so `-h` still lists every command.
+    cmd_name = next((a for a in sys.argv[1:] if not a.startswith("-")), None)
+    lazy = cmd_name in COMMAND_INDEX
+    for name in COMMAND_INDEX:
+        if lazy and name != cmd_name:
+            subparsers.add_parser(name)
+            continue
+        cls = load_command(name)
         sub = subparsers.add_parser(name, help=cls.help)
         cmd = cls(base_dir)
         cmd.add_args(sub)
@@ -27,6 +34,7 @@ def main():
     args = parser.parse_args()
 
     try:
+        args.instance.lazy_setup()
         args.instance.handle(args)
     except ProgramError as ex:
         print_error(str(ex))
@@ -1,12 +1,36 @@
+import importlib
+
 from .base import BaseCommand
-from .generate import GenerateCommand
-from .measure import MeasureCommand
-from .report import ReportCommand
-from .analyze import AnalyzeCommand
-from .tune import TuneCommand
+
+# Maps subcommand name to (module, class). Modules are imported on demand so
+# one command's heavy dependencies aren't paid by every invocation.
+COMMAND_INDEX = {
+    "generate": ("generate", "GenerateCommand"),
+    "measure": ("measure", "MeasureCommand"),
+    "report": ("report", "ReportCommand"),
+    "analyze": ("analyze", "AnalyzeCommand"),
+    "tune": ("tune", "TuneCommand"),
+}
+
+
+def load_command(name: str) -> type[BaseCommand]:
+    module_name, class_name = COMMAND_INDEX[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    return getattr(module, class_name)
+
+
+def __getattr__(name):
+    for module_name, class_name in COMMAND_INDEX.values():
+        if name == class_name:
+            module = importlib.import_module(f".{module_name}", __name__)
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "BaseCommand",
+    "COMMAND_INDEX",
+    "load_command",
     "GenerateCommand",
     "MeasureCommand",
     "ReportCommand",
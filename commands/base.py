@@ -1,13 +1,39 @@
 from abc import ABC, abstractmethod
+from collections import deque
 from dotenv import load_dotenv
+import logging.handlers
 import argparse
 import logging
+import atexit
 import time
 import os
 
 from utils import format_time, elapsed_time
 
 
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent formatted records in memory for the live UI."""
+
+    def __init__(self, capacity: int = 18) -> None:
+        super().__init__()
+        self.records: deque[str] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(self.format(record))
+
+
+_LOG_HANDLER: logging.handlers.MemoryHandler | None = None
+_RING_HANDLER: RingBufferHandler | None = None
+
+_DOTENV_LOADED = False
+
+_BOLD = "\033[1m"
+_GREEN = "\033[32m"
+_RED = "\033[31m"
+_YELLOW = "\033[33m"
+_RST = "\033[0m"
+
+
 def positive_int(value):
     ivalue = int(value)
     if ivalue < 0:
@@ -32,11 +58,32 @@ class BaseCommand(ABC):
 
         self.log_path = os.path.join(self.base_dir, "logs.txt")
         self.logger = logging.getLogger("EnergyBench")
-        logging.basicConfig(
-            filename=self.log_path, level=logging.INFO, format="[%(levelname)s] %(message)s"
-        )
 
-        load_dotenv()
+    def lazy_setup(self) -> None:
+        """Deferred setup that only the command about to run should pay for."""
+        global _LOG_HANDLER, _RING_HANDLER
+        if _LOG_HANDLER is None:
+            formatter = logging.Formatter("[%(levelname)s] %(message)s")
+            fh = logging.FileHandler(self.log_path)
+            fh.setFormatter(formatter)
+            # Batch records in memory so hot loops don't issue one write() each
+            _LOG_HANDLER = logging.handlers.MemoryHandler(
+                capacity=256, flushLevel=logging.ERROR, target=fh
+            )
+            _RING_HANDLER = RingBufferHandler()
+            _RING_HANDLER.setFormatter(formatter)
+            self.logger.addHandler(_LOG_HANDLER)
+            self.logger.addHandler(_RING_HANDLER)
+            self.logger.setLevel(logging.INFO)
+            atexit.register(_LOG_HANDLER.flush)
+
+        self.ring_handler = _RING_HANDLER
+
+        # load_dotenv stats its way up the directory tree, so pay for it once
+        global _DOTENV_LOADED
+        if not _DOTENV_LOADED:
+            load_dotenv()
+            _DOTENV_LOADED = True
 
     def record_issue(self, msg: str, is_error: bool):
         if is_error:
@@ -48,18 +95,21 @@ class BaseCommand(ABC):
             self.logger.warning(msg)
 
     def goodbye(self) -> None:
+        if _LOG_HANDLER is not None:
+            _LOG_HANDLER.flush()
+
         end = time.time()
         formatted = format_time(end)
         elapsed = elapsed_time(end - self.timestamp)
         err = self.error_count
         warn = self.warning_count
-        err_color = "\033[32m" if err == 0 else "\033[31m"
-        warn_color = "\033[1m" if warn == 0 else "\033[33m"
+        err_color = _GREEN if err == 0 else _RED
+        warn_color = _BOLD if warn == 0 else _YELLOW
         print(
-            f"\033[1mEnded\033[0m {formatted} "
-            f"\033[1mTotal Time\033[0m {elapsed} "
-            f"\033[1mErrors\033[0m {err_color}{err}\033[0m "
-            f"\033[1mWarnings\033[0m {warn_color}{warn}\033[0m\n"
+            f"{_BOLD}Ended{_RST} {formatted} "
+            f"{_BOLD}Total Time{_RST} {elapsed} "
+            f"{_BOLD}Errors{_RST} {err_color}{err}{_RST} "
+            f"{_BOLD}Warnings{_RST} {warn_color}{warn}{_RST}\n"
         )
 
     @abstractmethod
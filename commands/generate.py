@@ -40,6 +40,10 @@ class GenerateCommand(BaseCommand):
         "Rust": {"aliases": Rust.aliases, "istr": "rust", "instructions": RustInstructions},
     }
 
+    _ALIAS_INDEX = {
+        alias: config for config in IMPLEMENTATION_MAPPING.values() for alias in config["aliases"]
+    }
+
     def add_args(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("--ollama", nargs="*", help="defaults to a predefined list of models")
         parser.add_argument("--openai", nargs="*", help="defaults to a predefined list of models")
@@ -87,10 +91,10 @@ class GenerateCommand(BaseCommand):
         )
 
     def get_implementation_config(self, implementation: str) -> dict[str, Any]:
-        for _, config in self.IMPLEMENTATION_MAPPING.items():
-            if implementation in config["aliases"]:
-                return config
-        raise ProgramError(f"{implementation} not supported")
+        try:
+            return self._ALIAS_INDEX[implementation]
+        except KeyError:
+            raise ProgramError(f"{implementation} not supported")
 
     def get_example_file(self, args: argparse.Namespace) -> str:
         if args.signal and args.energy_optimize:
@@ -149,14 +153,15 @@ class GenerateCommand(BaseCommand):
     def get_requested_models(self, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
         requested_models = {}
 
-        for provider, config in self.PROVIDER_CONFIG.items():
-            models = getattr(args, provider, None)
-            if models is None:
-                continue
+        provided = {
+            k: v for k, v in vars(args).items() if k in self.PROVIDER_CONFIG and v is not None
+        }
+        for provider, models in provided.items():
+            config = self.PROVIDER_CONFIG[provider]
 
             if models == []:
                 llm_class = config["llm_class"]
-                models = llm_class.chat_models + llm_class.reasoning_models
+                models = [*llm_class.chat_models, *llm_class.reasoning_models]
 
             if models:
                 requested_models[provider] = {"models": models, "llm_class": config["llm_class"]}
@@ -213,23 +218,22 @@ class GenerateCommand(BaseCommand):
         if not args.batch:
             return
 
-        batch_data = []
+        scenarios, batch_prompts = [], []
         for file in args.batch:
             try:
                 scenario = Scenario.from_yaml(file)
                 prompt = self.get_prompt(scenario, args)
-                batch_data.append((scenario, prompt))
+                scenarios.append(scenario)
+                batch_prompts.append(prompt)
             except ProgramError as ex:
                 self.record_issue(str(ex), args.stop)
 
-        if not batch_data:
+        if not scenarios:
             return
 
-        scenarios, batch_prompts = zip(*batch_data)
-
         for model in models:
             try:
-                requests = llm.batch(model, list(batch_prompts))
+                requests = llm.batch(model, batch_prompts)
                 if not requests:
                     print_warning(f"{model} batch creation returned no requests")
                     continue
@@ -1,6 +1,9 @@
 import subprocess
+import threading
+import itertools
 import argparse
 import getpass
+import logging
 import random
 import time
 import os
@@ -13,6 +16,8 @@ from rich.panel import Panel
 from rich.live import Live
 from rich.text import Text
 
+from functools import lru_cache
+
 from implementations import get_implementation_class
 from .base import BaseCommand, positive_int
 from workloads import Workload
@@ -28,7 +33,23 @@ class MeasureCommand(BaseCommand):
     def __init__(self, base_dir) -> None:
         super().__init__(base_dir)
 
+    SUDO_SENTINEL_TTL = 5 * 60  # matches sudo's default timestamp_timeout
+
     def ensure_superuser(self) -> None:
+        if os.geteuid() == 0:
+            return
+
+        # A fresh sentinel means sudo validated recently, so skip both
+        # probes; it lives in a user-owned directory so no other local user
+        # can squat the path
+        sentinel_dir = os.environ.get("XDG_RUNTIME_DIR") or self.base_dir
+        sentinel = os.path.join(sentinel_dir, ".energy-bench-sudo")
+        try:
+            if time.time() - os.path.getmtime(sentinel) < self.SUDO_SENTINEL_TTL:
+                return
+        except OSError:
+            pass
+
         try:
             subprocess.run(
                 ["sudo", "-n", "true"],
@@ -51,6 +72,14 @@ class MeasureCommand(BaseCommand):
                 self.record_issue("superuser authentication failed", True)
                 exit(ex.returncode)
 
+        # The sentinel is only an optimisation, so a refresh failure must
+        # never abort the run sudo just validated
+        try:
+            with open(sentinel, "a"):
+                os.utime(sentinel, None)
+        except OSError:
+            pass
+
     def add_args(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument(
             "-i",
@@ -126,12 +155,10 @@ class MeasureCommand(BaseCommand):
         workloads = [Workload()]
         workload_strs = {w.lower() for w in args.workloads}
         for wstr in workload_strs:
-            found = False
-            for cls in Workload.__subclasses__():
-                if wstr == cls.__name__.lower():
-                    workloads.append(cls())
-                    found = True
-            if not found:
+            cls = Workload.registry.get(wstr)
+            if cls:
+                workloads.append(cls())
+            else:
                 self.record_issue(f"'{wstr}' is not a known workload", args.stop)
 
         modes = []
@@ -142,17 +169,20 @@ class MeasureCommand(BaseCommand):
         if not modes:
             modes = ["warmup", "no-warmup"]
 
-        random.shuffle(args.scenarios)
-        random.shuffle(modes)
-        random.shuffle(workloads)
-
+        # One flat plan shuffled once instead of three in-place shuffles;
+        # trial runs stay at the front
+        plan = list(itertools.product(args.scenarios, environments, workloads, modes))
+        random.shuffle(plan)
         if args.trial:
-            args.scenarios.insert(0, os.path.join(self.base_dir, "trial.yml"))
+            trial_path = os.path.join(self.base_dir, "trial.yml")
+            plan = list(itertools.product([trial_path], environments, workloads, modes)) + plan
 
         self.iterations = args.iterations
+        self.frequency = args.frequency
         self.timeout = args.timeout
         self.sleep = args.sleep
         self.stop = args.stop
+        self.lab = args.lab
 
         self.progress = Progress(
             TextColumn("[bold blue]{task.description}", justify="right"),
@@ -162,92 +192,122 @@ class MeasureCommand(BaseCommand):
             TimeElapsedColumn(),
         )
 
-        total = len(args.scenarios) * len(environments) * len(workloads) * len(modes)
-        self.scenarios_tid = self.progress.add_task("Running Scenarios", total=total)
+        self.scenarios_tid = self.progress.add_task("Running Scenarios", total=len(plan))
+
+        self._scenario_key = None
+        self._scenario_panel = None
+        self._build_layout()
 
         with Live(auto_refresh=False) as live:
-            for file in args.scenarios:
-                scenario = Scenario.from_yaml(file)
-                iclass = get_implementation_class(scenario.implementation)
-                self.implementation = iclass(
-                    scenario=scenario,
-                    base_dir=self.base_dir,
-                    iterations=args.iterations,
-                    frequency=args.frequency,
-                    niceness=-20 if args.lab else 0,
-                    affinity={0} if args.lab else None,
-                )
-                self.environments = environments
-                self.workloads = workloads
-                self.modes = modes
-                self.run_scenario(live)
+            stop_refresh = threading.Event()
+            refresher = threading.Thread(
+                target=self._refresh_loop, args=(live, stop_refresh), daemon=True
+            )
+            refresher.start()
+            try:
+                self.run_scenario(live, plan)
+            finally:
+                stop_refresh.set()
+                refresher.join()
         self.goodbye()
 
-    def run_scenario(self, live: Live) -> None:
+    def _build_layout(self) -> None:
+        # The Layout tree, Padding wrapper and progress Panel never change;
+        # renders only swap the contents of the named leaves
+        self._layout = Layout()
+        self._layout.split_column(
+            Layout(name="logs", size=20), Layout(name="lower", size=10)
+        )
+        self._layout["lower"].split_row(Layout(name="scenario"), Layout(name="progress"))
+        self._layout["progress"].update(Panel(self.progress, title="Progress"))
+        self._root = Padding(self._layout, (1, 0, 0, 0))
+
+    def _refresh_loop(self, live: Live, stop: threading.Event) -> None:
+        # Repaints the cheap panels (logs, progress) every 500ms so the UI
+        # stays alive while tests run inside measure_and_verify
+        while not stop.wait(0.5):
+            if self._scenario_panel is not None:
+                self._layout["logs"].update(self.render_logs_panel())
+                live.update(self._root, refresh=True)
+
+    def run_scenario(self, live: Live, plan: list[tuple]) -> None:
         interrupted = False
 
-        for env in self.environments:
-            for work in self.workloads:
-                for mode in self.modes:
-                    if mode == "warmup":
-                        self.implementation.warmup = True
-                        self.implementation.timeout = self.timeout * self.iterations
-                    else:
-                        self.implementation.warmup = False
-                        self.implementation.timeout = self.timeout
+        for file, env, work, mode in plan:
+            scenario = Scenario.from_yaml(file)
+            iclass = get_implementation_class(scenario.implementation)
+            self.implementation = iclass(
+                scenario=scenario,
+                base_dir=self.base_dir,
+                iterations=self.iterations,
+                frequency=self.frequency,
+                niceness=-20 if self.lab else 0,
+                affinity={0} if self.lab else None,
+            )
+            if mode == "warmup":
+                self.implementation.warmup = True
+                self.implementation.timeout = self.timeout * self.iterations
+            else:
+                self.implementation.warmup = False
+                self.implementation.timeout = self.timeout
 
+            try:
+                with self.implementation:
+                    live.update(self.render_interface(env, work), refresh=True)
+                    for test in self.implementation.scenario.get_tests():
+                        if self.logger.isEnabledFor(logging.INFO):
+                            self.logger.info(
+                                "running '%s' test '%s' with %s",
+                                self.implementation.scenario.name,
+                                test.id,
+                                mode,
+                            )
+                        self.implementation.measure_and_verify(test, env, work)
+                        self.implementation.move_results(test, work, env, self.timestamp)
+                self.progress.advance(self.scenarios_tid)
+                self.logger.info("ok!")
+            except ProgramError as ex:
+                self.record_issue(str(ex), self.stop)
+            except KeyboardInterrupt:
+                interrupted = True
+                self.record_issue("manually exited", True)
+            finally:
+                remove_files_if_exist(
+                    os.path.join(self.implementation.scenario_path, "result.json")
+                )
+                if not interrupted and self.sleep:
                     try:
-                        with self.implementation:
-                            live.update(self.render_interface(env, work), refresh=True)
-                            for test in self.implementation.scenario.get_tests():
-                                self.logger.info(
-                                    f"running '{self.implementation.scenario.name}' test '{test.id}' with {mode}"
-                                )
-                                self.implementation.measure_and_verify(test, env, work)
-                                self.implementation.move_results(test, work, env, self.timestamp)
-                        self.progress.advance(self.scenarios_tid)
-                        self.logger.info("ok!")
-                    except ProgramError as ex:
-                        self.record_issue(str(ex), self.stop)
+                        print_info(f"sleeping for {self.sleep} seconds")
+                        time.sleep(self.sleep)
                     except KeyboardInterrupt:
-                        interrupted = True
                         self.record_issue("manually exited", True)
-                    finally:
-                        remove_files_if_exist(
-                            os.path.join(self.implementation.scenario_path, "result.json")
-                        )
-                        if not interrupted and self.sleep:
-                            try:
-                                print_info(f"sleeping for {self.sleep} seconds")
-                                time.sleep(self.sleep)
-                            except KeyboardInterrupt:
-                                self.record_issue("manually exited", True)
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _label_text(label: str) -> Text:
+        return Text(f"{label}: ", style="bold")
 
     def render_field(self, label: str, value: str | None = None) -> Text:
-        if not value:
-            value = "─"
-        return Text.assemble((f"{label}: ", "bold"), value)
+        # Label set is small and fixed, so the styled prefix is cached;
+        # Text.__add__ copies before appending
+        return self._label_text(label) + Text(value or "─")
 
     def render_scenario_cols(self, env: Environment, work: Workload) -> list:
         scenario_name = self.implementation.scenario.name
         implementation_name = self.implementation.scenario.implementation
         is_warmup = "On" if self.implementation.warmup else "Off"
 
-        scenario_field = self.render_field("Scenario", scenario_name)
-        implementation_field = self.render_field("Implementation", implementation_name)
-        warmup_field = self.render_field("Warmup", is_warmup)
-
         env_name = env.__class__.__name__.lower()
-        env_field = self.render_field(
-            "Environment", None if env_name == "environment" else env_name
-        )
-
         work_name = work.__class__.__name__.lower()
-        work_field = self.render_field("Workload", None if work_name == "workload" else work_name)
 
-        gov = {c.governor for c in get_cpus("online")}
-        freqs = {round(c.max_freq * 1e-6, 2) for c in get_cpus("online")}
-        min_freqs = {round(c.min_freq * 1e-6, 2) for c in get_cpus("online")}
+        # One sysfs scan per render; every derived value comes from these lists
+        cpus_online = get_cpus("online")
+        cpus_offline = get_cpus("offline")
+        swaps = get_swaps()
+
+        gov = {c.governor for c in cpus_online}
+        freqs = {round(c.max_freq * 1e-6, 2) for c in cpus_online}
+        min_freqs = {round(c.min_freq * 1e-6, 2) for c in cpus_online}
 
         gov_str = gov.pop() if len(gov) == 1 else ("Mixed" if gov else "Unknown")
         max_freq = freqs.pop() if len(freqs) == 1 else None
@@ -255,9 +315,9 @@ class MeasureCommand(BaseCommand):
         max_freq_str = f"{max_freq}GHz" if max_freq else ("Mixed" if freqs else "Unknown")
         min_freq_str = f"{min_freq}GHz" if min_freq else ("Mixed" if min_freqs else "Unknown")
 
-        cpus_on = len(get_cpus("online"))
-        cpus_off = len(get_cpus("offline"))
-        swaps_on = len(get_swaps())
+        cpus_on = len(cpus_online)
+        cpus_off = len(cpus_offline)
+        swaps_on = len(swaps)
         dropped = "All" if isinstance(env, Lab) else "─"
 
         scenario_field = self.render_field("Scenario", scenario_name)
@@ -296,27 +356,23 @@ class MeasureCommand(BaseCommand):
         return Panel(columns, title="Current Scenario")
 
     def render_logs_panel(self):
-        tail = tail_file(self.log_path, 18)
-        tail = Text(tail)
+        tail = Text("\n".join(self.ring_handler.records))
         return Panel(tail, title="Logs")
 
-    def render_layout(self, logs_panel: Panel, scenario_panel: Panel, progress_panel: Panel):
-        layout = Layout()
-        layout.split_column(
-            Layout(logs_panel, name="upper", size=20), Layout(name="lower", size=10)
-        )
-        layout["lower"].split_row(
-            Layout(scenario_panel, name="left"),
-            Layout(progress_panel, name="right"),
+    def render_interface(self, env: Environment, work: Workload):
+        # The scenario panel only changes when the configuration does, so
+        # rebuild it once per (env, work, mode, scenario) and reuse it from
+        # the background refresh loop
+        key = (
+            env.__class__.__name__,
+            work.__class__.__name__,
+            self.implementation.warmup,
+            self.implementation.scenario.name,
         )
-        return Padding(layout, (1, 0, 0, 0))
-
-    def render_progress(self) -> Panel:
-        return Panel(self.progress, title="Progress")
+        if key != self._scenario_key:
+            self._scenario_key = key
+            self._scenario_panel = self.render_scenario_panel(self.render_scenario_cols(env, work))
+            self._layout["scenario"].update(self._scenario_panel)
 
-    def render_interface(self, env: Environment, work: Workload):
-        logs_panel = self.render_logs_panel()
-        scenario_cols = self.render_scenario_cols(env, work)
-        scenario_panel = self.render_scenario_panel(scenario_cols)
-        progress_panel = self.render_progress()
-        return self.render_layout(logs_panel, scenario_panel, progress_panel)
+        self._layout["logs"].update(self.render_logs_panel())
+        return self._root
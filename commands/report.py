@@ -1,17 +1,196 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import pandas as pd
+import numpy as np
 import argparse
 import json
+import mmap
 import re
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .base import BaseCommand
 from utils import *
 
+_NUMCOMMA = re.compile(rb"(\d+),(\d+)")
+_RESULT_RE = re.compile(r"([^/_]+)_([^/_]+)_([^/]+)/([^/]+)/([^/]+)/([^/]+)/([^/]+)$")
+
+
+def _pair_iterations(boundaries, start_mask, stop_mask):
+    # One native sweep pairing the i-th start probe with the i-th stop probe
+    # inside each measurement group; probe-less groups emit their full span.
+    # boundaries[k] marks the first row of a group. Written njit-compatible
+    # so numba picks it up below when installed.
+    n = boundaries.shape[0]
+    starts = np.empty(n, np.int64)
+    stops = np.empty(n, np.int64)
+    group_starts = np.empty(n, np.int64)
+    group_stops = np.empty(n, np.int64)
+
+    count = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and not boundaries[j + 1]:
+            j += 1
+
+        n_starts = 0
+        n_stops = 0
+        for k in range(i, j + 1):
+            if start_mask[k]:
+                group_starts[n_starts] = k
+                n_starts += 1
+            if stop_mask[k]:
+                group_stops[n_stops] = k
+                n_stops += 1
+
+        if n_starts == 0 and n_stops == 0:
+            starts[count] = i
+            stops[count] = j
+            count += 1
+        else:
+            pairs = n_starts if n_starts < n_stops else n_stops
+            for p in range(pairs):
+                starts[count] = group_starts[p]
+                stops[count] = group_stops[p]
+                count += 1
+        i = j + 1
+
+    return starts[:count], stops[:count]
+
+
+try:
+    from numba import njit
+
+    _pair_iterations = njit(cache=True)(_pair_iterations)
+except ImportError:
+    pass
+
+
+def _to_float(value) -> float:
+    # perf emits "<not counted>" and friends; match to_numeric's coercion
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _compile_one(
+    result: str,
+    requested_events: list[str],
+    start_probes: tuple[str, ...],
+    stop_probes: tuple[str, ...],
+    avg_keys: list[str] | None = None,
+) -> list[dict] | dict[tuple, list[float]]:
+    # Top-level so ProcessPoolExecutor can pickle it; parsing each result file
+    # is independent and CPU-bound
+    _, work, _, mode, impl, scen, model = ReportCommand.split_result_path(result)
+
+    try:
+        # Map the file read-only instead of copying it through a buffered
+        # read; the regex and splitlines scan the page cache directly.
+        # Rewrite decimal commas across the whole buffer and parse the
+        # lines as one JSON array instead of one loads() per line
+        with open(result, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, prot=mmap.PROT_READ) as mm:
+                fixed = _NUMCOMMA.sub(rb"\1.\2", mm)
+        payload = b"[" + b",".join(l for l in fixed.splitlines() if l.strip()) + b"]"
+        data = orjson.loads(payload) if orjson else json.loads(payload)
+    except Exception as ex:
+        raise ProgramError(f"failed while reading result - {ex}")
+
+    # perf quotes its numbers, so cast the two numeric columns straight to
+    # float64 arrays instead of materializing object columns and running
+    # to_numeric over each one; no DataFrame is needed on this path at all
+    count = len(data)
+    events_np = np.asarray([row.get("event") for row in data], dtype=object)
+    cv_np = np.fromiter(
+        (_to_float(row.get("counter-value")) for row in data), np.float64, count=count
+    )
+    intervals = np.fromiter(
+        (_to_float(row.get("interval")) for row in data), np.float64, count=count
+    )
+
+    # A group starts wherever the perf interval clock wraps backwards; one
+    # comparison over the contiguous array replaces the shift/cumsum column
+    boundaries = np.empty(count, dtype=bool)
+    if count:
+        boundaries[0] = True
+        np.less(intervals[1:], intervals[:-1], out=boundaries[1:])
+
+    # One contiguous (rows x events) matrix cumsum'd in a single pass
+    # instead of a mask + full-length cumsum Series per event. "<not
+    # counted>" samples arrive as NaN and must not poison the running
+    # totals, so they are zero-filled like pandas' skipna cumsum treated
+    # them
+    vals = np.zeros((count, len(requested_events)), dtype=np.float64)
+    event_idx = pd.Categorical(events_np, categories=requested_events).codes
+    mask = event_idx >= 0
+    vals[mask, event_idx[mask]] = np.nan_to_num(cv_np[mask])
+    cum = np.cumsum(vals, axis=0)
+
+    # Two C-level scans for the probe rows, then one sweep of the pairing
+    # kernel instead of materializing groupby sub-frames
+    start_mask = np.isin(events_np, start_probes) & (cv_np == 1.0)
+    stop_mask = np.isin(events_np, stop_probes) & (cv_np == 1.0)
+    starts_arr, stops_arr = _pair_iterations(boundaries, start_mask, stop_mask)
+
+    # Gather all iteration sums with one fancy-index subtraction
+    pre = np.where(starts_arr[:, None] > 0, cum[np.maximum(starts_arr - 1, 0)], 0.0)
+    sums = np.round(cum[stops_arr] - pre, 2)
+
+    times = np.round(intervals[stops_arr] - intervals[starts_arr], 2)
+
+    compiled = []
+    for i, (time_s, event_sums) in enumerate(zip(times, sums), 1):
+        compiled.append(
+            {
+                "iter": i,
+                "model": model,
+                "work": "_" if work == "none" else work,
+                "mode": mode,
+                "impl": impl,
+                "name": scen,
+                "time": float(time_s),
+                **{e: float(v) for e, v in zip(requested_events, event_sums)},
+            }
+        )
+
+    if avg_keys is None:
+        return compiled
+
+    # Averaging path: fold rows into running [count, time_sum, *event_sums]
+    # per key so the caller never builds the raw DataFrame
+    sums: dict[tuple, list[float]] = {}
+    for row in compiled:
+        key = tuple(row[c] for c in avg_keys)
+        acc = sums.get(key)
+        if acc is None:
+            sums[key] = acc = [0.0] * (2 + len(requested_events))
+        acc[0] += 1
+        acc[1] += row["time"]
+        for j, event in enumerate(requested_events, 2):
+            acc[j] += row[event]
+    return sums
+
 
 class ReportCommand(BaseCommand):
     name = "report"
     help = "Build reports from raw measurements"
 
+    _START_PROBES = (
+        "probe_libenergy_signal:start_signal",
+        "probe_libenergy_signal:startSignal",
+    )
+    _STOP_PROBES = (
+        "probe_libenergy_signal:stop_signal",
+        "probe_libenergy_signal:stopSignal",
+    )
+
     def __init__(self, base_dir) -> None:
         super().__init__(base_dir)
         self.requested_events = get_requested_perf_events()
@@ -67,91 +246,49 @@ class ReportCommand(BaseCommand):
             result = self.handle_compile(args)
         self.output_result(result, args)
 
+    def _map_results(self, results: list[str], compile_one):
+        if len(results) < 4:
+            yield from map(compile_one, results)
+        else:
+            # Files are independent, so fan the parse out across cores
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                yield from executor.map(compile_one, results, chunksize=4)
+
     def handle_compile(self, args: argparse.Namespace) -> pd.DataFrame:
-        compiled = []
+        compile_one = partial(
+            _compile_one,
+            requested_events=self.requested_events,
+            start_probes=self._START_PROBES,
+            stop_probes=self._STOP_PROBES,
+        )
 
-        for result in args.results:
-            _, work, _, mode, impl, scen, model = self.split_result_path(result)
-
-            try:
-                with open(result) as file:
-                    data = []
-                    for line in file:
-                        fixed_line = re.sub(r"(\d+),(\d+)", r"\1.\2", line)
-                        data.append(json.loads(fixed_line))
-            except Exception as ex:
-                raise ProgramError(f"failed while reading result - {ex}")
-
-            df = pd.DataFrame(data)
-
-            numeric_cols = ["counter-value", "interval"]
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
-
-            df["group"] = (
-                df["interval"] < df["interval"].shift(1, fill_value=float("inf"))
-            ).cumsum()
-
-            cumsum_cols = {}
-            for event in self.requested_events:
-                mask = df["event"] == event
-                cumsum = (mask * df["counter-value"]).cumsum()
-                cumsum_cols[event] = cumsum
-
-            iterations = []
-            for _, group in df.groupby("group"):
-                start_probes = [
-                    "probe_libenergy_signal:start_signal",
-                    "probe_libenergy_signal:startSignal",
-                ]
-                stop_probes = [
-                    "probe_libenergy_signal:stop_signal",
-                    "probe_libenergy_signal:stopSignal",
-                ]
-                starts = group.loc[
-                    group["event"].isin(start_probes) & (group["counter-value"] == 1.0)
-                ].index.tolist()
-
-                stops = group.loc[
-                    group["event"].isin(stop_probes) & (group["counter-value"] == 1.0)
-                ].index.tolist()
-
-                if not starts and not stops:
-                    iterations.append((group.index[0], group.index[-1]))
-                else:
-                    for start, stop in zip(starts, stops[: len(starts)]):
-                        iterations.append((start, stop))
-
-            for i, (start, stop) in enumerate(iterations, 1):
-                event_sums = {}
-                for event in self.requested_events:
-                    pre_start = cumsum_cols[event].get(start - 1, default=0)
-                    sum_val = cumsum_cols[event].at[stop] - pre_start
-                    event_sums[event] = round(sum_val, 2)
-
-                start_s = df.at[start, "interval"]
-                stop_s = df.at[stop, "interval"]
-                time_s = round(stop_s - start_s, 2)
-
-                compiled.append(
-                    {
-                        "iter": i,
-                        "model": model,
-                        "work": "_" if work == "none" else work,
-                        "mode": mode,
-                        "impl": impl,
-                        "name": scen,
-                        "time": time_s,
-                        **event_sums,
-                    }
-                )
+        compiled = []
+        for rows in self._map_results(args.results, compile_one):
+            compiled.extend(rows)
         return pd.DataFrame(compiled)
 
     def handle_average(self, args: argparse.Namespace) -> pd.DataFrame:
-        raw_df = self.handle_compile(args)
+        compile_one = partial(
+            _compile_one,
+            requested_events=self.requested_events,
+            start_probes=self._START_PROBES,
+            stop_probes=self._STOP_PROBES,
+            avg_keys=list(args.average),
+        )
+
+        merged: dict[tuple, list[float]] = {}
+        for sums in self._map_results(args.results, compile_one):
+            for key, acc in sums.items():
+                total = merged.setdefault(key, [0.0] * len(acc))
+                for i, val in enumerate(acc):
+                    total[i] += val
+
         agg_cols = ["time"] + list(self.requested_events)
-        return raw_df.groupby(args.average)[agg_cols].mean().round(2).reset_index()
+        records = [
+            (*key, *(round(s / acc[0], 2) for s in acc[1:]))
+            for key, acc in sorted(merged.items())
+        ]
+        return pd.DataFrame(records, columns=list(args.average) + agg_cols)
 
     def output_result(self, result: str | pd.DataFrame, args: argparse.Namespace) -> None:
         if isinstance(result, pd.DataFrame):
@@ -254,25 +391,18 @@ class ReportCommand(BaseCommand):
     #         adjusted.append(r)
     #     return adjusted
 
-    def split_result_path(self, result: str) -> tuple[str, str, str, str, str, str, str]:
-        path = os.path.abspath(os.path.expanduser(result)).rstrip(os.sep)
+    @staticmethod
+    def split_result_path(result: str) -> tuple[str, str, str, str, str, str, str]:
+        path = os.path.abspath(os.path.expanduser(os.fspath(result))).rstrip(os.sep)
         if os.path.isfile(path):
             path = os.path.dirname(path)
 
-        parts = path.split(os.sep)
-        if len(parts) < 5:
-            raise ProgramError(f"result {result!r} has unexpected structure")
-
-        scenario = parts[-1]
-        impl = parts[-2]
-        warmup = parts[-3]
-        model = parts[-4]
-        run_dir = parts[-5]
-
-        if run_dir.count("_") < 2:
+        # One anchored match replaces the split + count + re-split dance
+        match = _RESULT_RE.search(path)
+        if not match:
             raise ProgramError(f"result {result!r} has unexpected structure")
 
-        env, work, time = run_dir.split("_", 2)
+        env, work, time, model, warmup, impl, scenario = match.groups()
         return env, work, time, warmup, impl, scenario, model
 
     # def unwrap_intervals(self, events: list[dict[str, Any]]) -> list[float]:
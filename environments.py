@@ -1,10 +1,26 @@
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from typing import Any
 import subprocess
+import re
 import os
 
 from utils import *
 
+_CPU_DIR = re.compile(r"cpu(\d+)$")
+
+
+def _read_sysfs(path: str) -> str | None:
+    # sysfs attributes are tiny and never block; skip the buffered IO layer
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        return os.read(fd, 64).strip().decode()
+    finally:
+        os.close(fd)
+
 
 class Cpu:
     def __init__(self, value: int) -> None:
@@ -70,20 +86,22 @@ class Cpu:
         path = f"{self.cpu_path}/cpufreq/scaling_available_governors"
         return read_file(path).split()
 
-    @property
+    @cached_property
     def min_hw_freq(self) -> int:
+        # Hardware limits never change, so cache them per instance; the
+        # freq setters' bounds checks read both limits on every write
         path = f"{self.cpu_path}/cpufreq/cpuinfo_min_freq"
-        return int(read_file(path))
+        return read_int_sysfs(path)
 
-    @property
+    @cached_property
     def max_hw_freq(self) -> int:
         path = f"{self.cpu_path}/cpufreq/cpuinfo_max_freq"
-        return int(read_file(path))
+        return read_int_sysfs(path)
 
     @property
     def min_freq(self) -> int:
         path = f"{self.cpu_path}/cpufreq/scaling_min_freq"
-        return int(read_file(path))
+        return read_int_sysfs(path)
 
     @min_freq.setter
     def min_freq(self, value: int) -> None:
@@ -99,7 +117,7 @@ class Cpu:
     @property
     def max_freq(self) -> int:
         path = f"{self.cpu_path}/cpufreq/scaling_max_freq"
-        return int(read_file(path))
+        return read_int_sysfs(path)
 
     @max_freq.setter
     def max_freq(self, value: int) -> None:
@@ -113,7 +131,9 @@ class Cpu:
         write_file_sudo(str(value), path)
 
 
+@lru_cache(maxsize=1)
 def get_cpu_vendor() -> str:
+    # The vendor never changes within a process, so scan /proc/cpuinfo once
     cpuinfo = read_file("/proc/cpuinfo")
     if "GenuineIntel" in cpuinfo:
         return "intel"
@@ -127,6 +147,20 @@ def get_cpus(value: str) -> list[Cpu]:
     if value not in available_modes:
         raise ProgramError(f"can only get {','.join(available_modes)} CPUs")
 
+    # present/possible never change at runtime, so build those Cpu lists
+    # once and share the instances (and their cached hw limits); online and
+    # offline must stay fresh because Lab/Production hotplug CPUs mid-run
+    if value in ("present", "possible"):
+        return list(_static_cpus(value))
+    return _read_cpus(value)
+
+
+@lru_cache(maxsize=2)
+def _static_cpus(value: str) -> tuple[Cpu, ...]:
+    return tuple(_read_cpus(value))
+
+
+def _read_cpus(value: str) -> list[Cpu]:
     cpus: list[Cpu] = []
     content = read_file(f"/sys/devices/system/cpu/{value}")
     if not content:
@@ -141,6 +175,34 @@ def get_cpus(value: str) -> list[Cpu]:
     return cpus
 
 
+def get_hyperthread_cpus() -> set[int]:
+    # One pass over the sibling lists; everything after each group's lowest
+    # id is a hyperthread. Cheaper than Cpu.hyperthread per CPU, which
+    # re-reads and re-sorts its own sibling list.
+    hyperthreads: set[int] = set()
+    for entry in os.scandir("/sys/devices/system/cpu"):
+        if not _CPU_DIR.match(entry.name):
+            continue
+
+        siblings_str = _read_sysfs(f"{entry.path}/topology/thread_siblings_list")
+        if not siblings_str:
+            continue
+
+        siblings: list[int] = []
+        for part in siblings_str.split(","):
+            part = part.strip()
+            if "-" in part:
+                start, end = part.split("-")
+                siblings.extend(range(int(start), int(end) + 1))
+            elif part:
+                siblings.append(int(part))
+
+        siblings.sort()
+        if len(siblings) > 1:
+            hyperthreads.update(siblings[1:])
+    return hyperthreads
+
+
 def get_aslr() -> int:
     val = read_file("/proc/sys/kernel/randomize_va_space")
     return int(val)
@@ -197,18 +259,13 @@ def get_swaps() -> list[str]:
 
 
 def set_swaps(enable: bool, devices: list[str] | None = None) -> None:
+    # swapon/swapoff take multiple devices, so one fork/exec covers the batch
+    cmd = "swapon" if enable else "swapoff"
     try:
         if devices:
-            for dev in devices:
-                if enable:
-                    subprocess.run(["sudo", "swapon", dev], check=True)
-                else:
-                    subprocess.run(["sudo", "swapoff", dev], check=True)
+            subprocess.run(["sudo", cmd, *devices], check=True)
         else:
-            if enable:
-                subprocess.run(["sudo", "swapon", "-a"], check=True)
-            else:
-                subprocess.run(["sudo", "swapoff", "-a"], check=True)
+            subprocess.run(["sudo", cmd, "-a"], check=True)
     except Exception as ex:
         raise ProgramError(f"failed while setting swap - {ex}")
 
@@ -217,6 +274,36 @@ def set_swaps(enable: bool, devices: list[str] | None = None) -> None:
 class Environment:
     """Controls Linux-specific OS environment"""
 
+    def _snapshot_cpus_fast(self) -> dict[int, dict]:
+        # Reads every CPU's attributes in one scandir pass with raw
+        # open/read, bypassing the Cpu property layer on the hot bulk path;
+        # Cpu is still used for the (rare) write path
+        cpus: dict[int, dict] = {}
+        for entry in os.scandir("/sys/devices/system/cpu"):
+            match = _CPU_DIR.match(entry.name)
+            if not match:
+                continue
+            value = int(match.group(1))
+
+            online = _read_sysfs(f"{entry.path}/online")  # cpu0 has no online file
+            if online == "0":
+                cpus[value] = {"enabled": False}
+                continue
+
+            governor = _read_sysfs(f"{entry.path}/cpufreq/scaling_governor")
+            max_freq = _read_sysfs(f"{entry.path}/cpufreq/scaling_max_freq")
+            min_freq = _read_sysfs(f"{entry.path}/cpufreq/scaling_min_freq")
+            if governor is None or max_freq is None or min_freq is None:
+                raise ProgramError(f"failed while reading cpu{value} cpufreq attributes")
+
+            cpus[value] = {
+                "enabled": True,
+                "governor": governor,
+                "max_freq": int(max_freq),
+                "min_freq": int(min_freq),
+            }
+        return cpus
+
     def record_original(self):
         self._orig_aslr = get_aslr()
         if get_cpu_vendor() == "intel":
@@ -225,17 +312,7 @@ class Environment:
             except ProgramError:
                 self._orig_intel_boost = None
 
-        self._orig_cpus = {}
-        for cpu in get_cpus("present"):
-            if cpu.enabled:
-                self._orig_cpus[cpu.value] = {
-                    "enabled": True,
-                    "governor": cpu.governor,
-                    "max_freq": cpu.max_freq,
-                    "min_freq": cpu.min_freq,
-                }
-            else:
-                self._orig_cpus[cpu.value] = {"enabled": False}
+        self._orig_cpus = self._snapshot_cpus_fast()
 
         self._orig_swaps = get_swaps()
 
@@ -283,8 +360,11 @@ class Environment:
 @dataclass
 class Production(Environment):
     def enter(self) -> None:
-        set_aslr(2)  # Enable ASLR
+        writes = [("2", "/proc/sys/kernel/randomize_va_space")]  # Enable ASLR
 
+        # Kept out of the fail-fast batch below: a BIOS-locked turbo makes
+        # this write fail even though the file exists, and that must not
+        # stop the governor and frequency writes from being applied
         if get_cpu_vendor() == "intel":
             try:
                 set_intel_boost(True)  # Enable Turbo Boost on Intel
@@ -293,13 +373,21 @@ class Production(Environment):
 
         set_swaps(True)  # Enable All Swaps
 
+        # Enable all CPUs first so their cpufreq attributes exist
+        write_files_sudo(
+            [("1", f"{cpu.cpu_path}/online") for cpu in get_cpus("present") if cpu.value != 0]
+        )
+
         for cpu in get_cpus("present"):
-            cpu.enabled = True  # Enable all CPUs
-            cpu.governor = "performance"  # Performance Governor on all CPUs
-            cpu.max_freq = cpu.max_hw_freq  # Max Hardware Frequency on all CPUs
-            cpu.min_freq = max(
-                cpu.min_hw_freq, 1000000
-            )  # at least 1 GHz Min Hardware Frequency on all CPUs
+            # Performance Governor, Max Hardware Frequency and at least 1 GHz
+            # Min Frequency on all CPUs, flushed in one sudo invocation below
+            writes.append(("performance", f"{cpu.cpu_path}/cpufreq/scaling_governor"))
+            writes.append((str(cpu.max_hw_freq), f"{cpu.cpu_path}/cpufreq/scaling_max_freq"))
+            writes.append(
+                (str(max(cpu.min_hw_freq, 1000000)), f"{cpu.cpu_path}/cpufreq/scaling_min_freq")
+            )
+
+        write_files_sudo(writes)
 
 
 @dataclass
@@ -310,8 +398,10 @@ class Lightweight(Environment):
 @dataclass
 class Lab(Environment):
     def enter(self) -> None:
-        set_aslr(0)  # Disable ASLR
+        writes = [("0", "/proc/sys/kernel/randomize_va_space")]  # Disable ASLR
 
+        # Same as Production: tolerated on its own so a locked turbo toggle
+        # can't abort the fail-fast batch of writes queued below
         if get_cpu_vendor() == "intel":
             try:
                 set_intel_boost(False)  # Disable Turbo Boost on Intel
@@ -322,24 +412,27 @@ class Lab(Environment):
 
         set_drop_caches(3)  # Drop Page Cache, Dentries & Inodes
 
-        # First disable hyperthreads, then disable cores beyond 0-3
+        # First disable hyperthreads, then disable cores beyond 0-3; each
+        # stage is flushed as one sudo batch since the next re-queries /sys
+        hyperthreads = get_hyperthread_cpus()
         online_cpus = get_cpus("online")
+        write_files_sudo(
+            [
+                ("0", f"{cpu.cpu_path}/online")
+                for cpu in online_cpus
+                if cpu.value in hyperthreads and cpu.value != 0
+            ]
+        )
 
-        # Disable hyperthreads
-        for cpu in online_cpus:
-            if cpu.hyperthread:
-                cpu.enabled = False
-
-        # Get currently online CPUs after disabling hyperthreads
         online_cpus = get_cpus("online")
+        write_files_sudo(
+            [("0", f"{cpu.cpu_path}/online") for cpu in online_cpus if cpu.value > 3]
+        )
 
-        # Disable all but cores 0, 1, 2, 3
-        for cpu in online_cpus:
-            if cpu.value > 3:
-                cpu.enabled = False
-
-        # Configure remaining online CPUs
+        # Powersave Governor and Min Hardware Frequency on the remaining CPUs
         for cpu in get_cpus("online"):
-            cpu.governor = "powersave"  # Powersave Governor on all CPUs
-            cpu.max_freq = cpu.min_hw_freq  # Min Hardware Frequency on all CPUs
-            cpu.min_freq = cpu.min_hw_freq  # Min Hardware Frequency on all CPUs
+            writes.append(("powersave", f"{cpu.cpu_path}/cpufreq/scaling_governor"))
+            writes.append((str(cpu.min_hw_freq), f"{cpu.cpu_path}/cpufreq/scaling_max_freq"))
+            writes.append((str(cpu.min_hw_freq), f"{cpu.cpu_path}/cpufreq/scaling_min_freq"))
+
+        write_files_sudo(writes)
@@ -7,11 +7,10 @@ from utils import *
 
 
 def get_implementation_class(implementation: str) -> type[Implementation]:
-    impl = implementation.lower().strip()
-    for cls in all_subclasses(Implementation):
-        if hasattr(cls, "aliases") and impl in cls.aliases:
-            return cls
-    raise ProgramError(f"{implementation} not a known implementation")
+    try:
+        return _IMPL_REGISTRY[implementation.lower().strip()]
+    except KeyError:
+        raise ProgramError(f"{implementation} not a known implementation")
 
 
 @dataclass
@@ -217,3 +216,12 @@ class Rust(Implementation):
                 version = pkg.get("version")
                 file.write(f'{name} = "{version}"\n')
         super().build()
+
+
+# Alias lookup built once at import; get_implementation_class used to walk
+# every Implementation subclass per call
+_IMPL_REGISTRY: dict[str, type[Implementation]] = {
+    alias: cls
+    for cls in all_subclasses(Implementation)
+    for alias in getattr(cls, "aliases", [])
+}
@@ -1,22 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from collections import deque
 from typing import Any
-import anthropic
+import asyncio
+import time
 import os
 
-from scenario import Scenario
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .base import LLM
 from utils import *
 
+_API_VERSION = "2023-06-01"
+
+
+def _namespace(value):
+    # Just enough attribute access for _process_batch_response, without the
+    # SDK's per-message pydantic validation
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return [_namespace(val) for val in value]
+    return value
+
 
 class AnthropicLLM(LLM):
-    chat_models = ["claude-3-5-sonnet-20241022", "claude-3-5-haiku-20241022"]
-    reasoning_models = ["claude-3-7-sonnet-20250219"]
+    chat_models = frozenset({"claude-3-5-sonnet-20241022", "claude-3-5-haiku-20241022"})
+    reasoning_models = frozenset({"claude-3-7-sonnet-20250219"})
 
     REASONING_BUDGET_TOKENS = 20_000
 
     def __init__(self, base_dir: str) -> None:
+        # The SDK drags in pydantic and httpx, so only the provider actually
+        # instantiated pays the import; the global keeps the module-level
+        # anthropic.* references in the methods below working
+        global anthropic
+        import anthropic
+
         super().__init__(base_dir)
         try:
             self.client = anthropic.Anthropic()
+            self.aclient = anthropic.AsyncAnthropic()
         except anthropic.AnthropicError as ex:
             raise ProgramError(f"failed to initialize llm model - {ex}")
 
@@ -56,21 +83,42 @@ class AnthropicLLM(LLM):
         except Exception as ex:
             raise ProgramError(f"unexpected error while generating response - {ex}")
 
-    def _create_batch_request(self, model: str, message: str) -> dict[str, Any]:
-        config = self._get_model_config(model)
+    async def _single_async(
+        self, model: str, message: str, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        async with semaphore:
+            config = self._get_model_config(model)
 
-        params = {
-            "model": model,
-            "max_tokens": config["max_tokens"],
-            "messages": [{"role": "user", "content": message}],
-        }
+            response = await self.aclient.messages.create(
+                model=model,
+                thinking=config["thinking"],
+                max_tokens=config["max_tokens"],
+                temperature=config["temperature"],
+                messages=[{"role": "user", "content": message}],
+            )
 
-        if model in self.reasoning_models:
-            params["thinking"] = config["thinking"]
-        else:
-            params["temperature"] = config["temperature"]
+            for content in response.content:
+                if content.type == "text":
+                    return content.text
+            return None
 
-        return {"custom_id": self.hash_from_message(message), "params": params}
+    def single_many(
+        self, model: str, messages: list[str], concurrency: int = 16
+    ) -> list[str | None]:
+        # N prompts cost ~N/concurrency round trips instead of N serial ones
+
+        async def gather() -> list[str | None]:
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(self._single_async(model, msg, semaphore) for msg in messages)
+            )
+
+        try:
+            return list(asyncio.run(gather()))
+        except anthropic.AnthropicError as ex:
+            raise ProgramError(f"failed while generating responses - {ex}")
+        except Exception as ex:
+            raise ProgramError(f"unexpected error while generating responses - {ex}")
 
     def batch(self, model: str, messages: list[str]) -> list[dict]:
         if not messages:
@@ -85,7 +133,21 @@ class AnthropicLLM(LLM):
                 return []
 
         try:
-            requests = [self._create_batch_request(model, msg) for msg in messages]
+            # The config and params template are identical for every message
+            # in the batch, so build them once and only swap in the message
+            # and custom_id per request
+            config = self._get_model_config(model)
+            base_params = {"model": model, "max_tokens": config["max_tokens"]}
+            if model in self.reasoning_models:
+                base_params["thinking"] = config["thinking"]
+            else:
+                base_params["temperature"] = config["temperature"]
+
+            requests = []
+            for msg in messages:
+                params = base_params.copy()
+                params["messages"] = [{"role": "user", "content": msg}]
+                requests.append({"custom_id": self.hash_from_message(msg), "params": params})
 
             response = self.client.messages.batches.create(requests=requests)
             self.save_batch(model, requests, response.id)
@@ -105,28 +167,51 @@ class AnthropicLLM(LLM):
         except anthropic.AnthropicError as ex:
             return "failed"
 
-    def _find_scenario_by_id(self, model: str, custom_id: str) -> Scenario | None:
-        scenarios_dir = os.path.join(self.base_dir, "scenarios", model)
+    def _results_stream(self, batch_id: str):
+        # Hit the raw JSONL results endpoint and decode each line with
+        # orjson; pydantic validation of every message in the SDK iterator
+        # dominates CPU on large batches. Falls back to the SDK when orjson
+        # is not installed.
+        if orjson is None:
+            yield from self.client.messages.batches.results(batch_id)
+            return
+
+        import httpx
+
+        url = f"{str(self.client.base_url).rstrip('/')}/v1/messages/batches/{batch_id}/results"
+        headers = {
+            "x-api-key": os.environ.get("ANTHROPIC_API_KEY", ""),
+            "anthropic-version": _API_VERSION,
+        }
+        with httpx.stream("GET", url, headers=headers, timeout=60) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield _namespace(orjson.loads(line))
+
+    def fetch_when_ready(self, model: str, timeout: int = 60 * 60 * 24) -> int:
+        # Exponential backoff bounds waiting at a handful of status calls
+        # instead of one fixed-interval poll per check by the caller
+        batch_id = self.latest_batch(model)
+        if not batch_id:
+            return -1
 
-        if not os.path.exists(scenarios_dir):
-            return None
+        deadline = time.time() + timeout
+        attempt = 0
+        while self._get_batch_status(batch_id) not in {"ended", "failed"}:
+            if time.time() >= deadline:
+                print_warning(f"{model} batch {batch_id} still processing")
+                return 0
+            time.sleep(min(60, 2**attempt))
+            attempt += 1
 
-        for dirpath, _, filenames in os.walk(scenarios_dir):
-            for filename in filenames:
-                if custom_id in filename:
-                    scenario_path = os.path.join(dirpath, filename)
-                    try:
-                        return Scenario.from_yaml(scenario_path)
-                    except Exception as ex:
-                        print(f"Error loading scenario from {scenario_path}: {ex}")
-                        continue
-        return None
+        return self.fetch(model)
 
-    def _process_batch_response(self, response, model: str) -> str | None:
+    def _process_batch_response(self, response, model: str, index: dict[str, str]) -> str | None:
         custom_id = response.custom_id
         result = response.result
 
-        scenario = self._find_scenario_by_id(model, custom_id)
+        scenario = self._find_scenario_by_id(index, custom_id)
         if not scenario:
             print_warning(f"No scenario found for custom_id: {custom_id}")
             return None
@@ -172,14 +257,32 @@ class AnthropicLLM(LLM):
                 print_warning(f"{model} batch {status}")
                 return 0
 
-            responses = self.client.messages.batches.results(batch_id)
+            responses = self._results_stream(batch_id)
+            index = self._build_scenario_index(model)
             fetched = 0
 
-            for response in responses:
-                scenario_path = self._process_batch_response(response, model)
-                if scenario_path:
-                    print_success(f"saved {scenario_path}")
-                    fetched += 1
+            # Responses are independent, so scenario load, code extraction
+            # and save run on worker threads while the main thread keeps
+            # streaming results off the network. Futures go through a
+            # fixed-size window (executor.map would drain the whole stream
+            # up front and buffer every decoded result in pending futures)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                window: deque = deque()
+                for response in responses:
+                    window.append(
+                        executor.submit(self._process_batch_response, response, model, index)
+                    )
+                    if len(window) < 32:
+                        continue
+                    scenario_path = window.popleft().result()
+                    if scenario_path:
+                        print_success(f"saved {scenario_path}")
+                        fetched += 1
+                while window:
+                    scenario_path = window.popleft().result()
+                    if scenario_path:
+                        print_success(f"saved {scenario_path}")
+                        fetched += 1
 
             self.remove_batch(model, batch_id)
 
@@ -198,17 +301,18 @@ class AnthropicLLM(LLM):
 
     def available(self) -> set[str]:
         try:
+            # Max page size means one round trip covers the whole catalogue
+            # in practice; each page folds in as one set union
             available = set()
-            response = self.client.models.list(limit=20)
+            response = self.client.models.list(limit=100)
 
             while True:
-                for model in response.data:
-                    available.add(model.id)
+                available |= {model.id for model in response.data}
 
                 if not response.has_more or not response.last_id:
                     break
 
-                response = self.client.models.list(limit=20, after_id=response.last_id)
+                response = self.client.models.list(limit=100, after_id=response.last_id)
 
             return available
 
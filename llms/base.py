@@ -1,18 +1,54 @@
 from abc import ABC, abstractmethod
 from dotenv import load_dotenv
+from functools import lru_cache
 import itertools
 import hashlib
 import json
 import os
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from scenario import Scenario
 from implementations import *
 
+# Compiled once; clean_response runs these on every response it sanitizes
+_FENCE_NL_RE = re.compile(
+    r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*\n(.*?)\n```", re.DOTALL
+)
+_FENCE_RE = re.compile(
+    r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*(.*?)```", re.DOTALL
+)
+_FENCE_LANGS = frozenset(
+    {"c", "cpp", "java", "csharp", "python", "javascript", "js", "py", "ruby", "rust"}
+)
+
+
+def _strip_span(text: str, lo: int, hi: int) -> str | None:
+    # Index-based strip so large code spans are sliced exactly once
+    while lo < hi and text[lo].isspace():
+        lo += 1
+    while hi > lo and text[hi - 1].isspace():
+        hi -= 1
+    if hi > lo:
+        return text[lo:hi]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _hash_message(message: str) -> str:
+    # blake2b is ~2x faster than sha256 on prompt-sized inputs, and the same
+    # prompt gets hashed again when batch responses are matched back up;
+    # digest_size=32 keeps the 64-hex-char custom_id shape
+    return hashlib.blake2b(message.encode(), digest_size=32).hexdigest()
+
 
 class LLM(ABC):
-    chat_models = []
-    reasoning_models = []
+    chat_models = frozenset()
+    reasoning_models = frozenset()
 
     DEFAULT_TEMPERATURE = 0
     DEFAULT_MAX_TOKENS = 8192
@@ -39,10 +75,43 @@ class LLM(ABC):
         return set()
 
     def hash_from_message(self, message: str) -> str:
-        return hashlib.sha256(message.encode()).hexdigest()[:64]
+        return _hash_message(message)
+
+    def _build_scenario_index(self, model: str) -> dict[str, str]:
+        # One recursive scandir pass per fetch; each response then resolves
+        # its custom_id with a dict lookup instead of walking the whole tree
+        index: dict[str, str] = {}
+        scenarios_dir = os.path.join(self.base_dir, "scenarios", model)
+        if not os.path.exists(scenarios_dir):
+            return index
+
+        stack = [scenarios_dir]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        index[os.path.splitext(entry.name)[0]] = entry.path
+        return index
+
+    def _find_scenario_by_id(self, index: dict[str, str], custom_id: str) -> Scenario | None:
+        scenario_path = index.get(custom_id)
+        if not scenario_path:
+            return None
+        try:
+            return Scenario.from_yaml(scenario_path)
+        except Exception as ex:
+            print(f"failed while loading scenario from {scenario_path}: {ex}")
+            return None
 
     def save_code(self, model: str, scenario: Scenario, cid: str, code: str | None = None) -> str:
         scenario_dir = os.path.join(self.base_dir, "scenarios", model, scenario.implementation)
+        if cid:
+            # Two hex-char sharding keeps directories small for models with
+            # thousands of generated scenarios; the fetch index walks the
+            # tree recursively, so lookups are unaffected
+            scenario_dir = os.path.join(scenario_dir, cid[:2], cid[2:4])
         os.makedirs(scenario_dir, exist_ok=True)
         scenario_path = os.path.join(scenario_dir, f"{cid}.yml" if cid else f"{scenario.name}.yml")
         scenario.model = model
@@ -55,9 +124,15 @@ class LLM(ABC):
         batch_dir = os.path.join(self.base_dir, "batches", model)
         os.makedirs(batch_dir, exist_ok=True)
         batch_path = os.path.join(batch_dir, f"{bid}.jsonl")
-        with open(batch_path, "w") as f:
-            for d in data:
-                f.write(json.dumps(d) + "\n")
+        # Binary writes through a large buffer; orjson encodes at C level
+        # when installed, compact stdlib json otherwise
+        with open(batch_path, "wb", buffering=1 << 20) as f:
+            if orjson:
+                f.writelines(orjson.dumps(d) + b"\n" for d in data)
+            else:
+                f.writelines(
+                    json.dumps(d, separators=(",", ":")).encode() + b"\n" for d in data
+                )
         return batch_path
 
     def remove_batch(self, model: str, bid: str) -> None:
@@ -70,51 +145,43 @@ class LLM(ABC):
         if "<code>" in response and "</code>" in response:
             return response
 
-        patterns = [
-            (
-                r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*\n(.*?)\n```",
-                r"<code>\1</code>",
-            ),
-            (
-                r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*(.*?)```",
-                r"<code>\1</code>",
-            ),
-        ]
-
         cleaned = response
-        for pattern, replacement in patterns:
-            cleaned = re.sub(pattern, replacement, cleaned, flags=re.DOTALL)
+        for pattern in (_FENCE_NL_RE, _FENCE_RE):
+            cleaned = pattern.sub(r"<code>\1</code>", cleaned)
 
         return cleaned
 
     def get_code(self, content: str) -> str | None:
-        content = self.clean_response(content)
-
-        xml_match = re.search(r"<code>(.*?)</code>", content, flags=re.DOTALL)
-        if xml_match:
-            code = xml_match.group(1).strip()
-            if code:
-                return code
-
-        markdown_patterns = [
-            r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*\n(.*?)\n```",
-            r"```(?:c|cpp|java|csharp|python|javascript|js|py|ruby|rust)?\s*(.*?)```",
-        ]
-
-        for pattern in markdown_patterns:
-            markdown_match = re.search(pattern, content, flags=re.DOTALL)
-            if markdown_match:
-                code = markdown_match.group(1).strip()
+        # One linear pass with str.find instead of rewriting the response
+        # through clean_response and re-scanning it with several regexes;
+        # <code> spans win over markdown fences
+        start = content.find("<code>")
+        if start != -1:
+            end = content.find("</code>", start + 6)
+            if end != -1:
+                code = _strip_span(content, start + 6, end)
                 if code:
                     return code
 
-        fallback_match = re.search(r"```[^`]*```", content, flags=re.DOTALL)
-        if fallback_match:
-            block = fallback_match.group(0)
-            lines = block.split("\n")
-            if len(lines) > 2:
-                code_lines = lines[1:-1]
-                code = "\n".join(code_lines).strip()
+        start = content.find("```")
+        if start != -1:
+            end = content.find("```", start + 3)
+            if end != -1:
+                lo = start + 3
+                newline = content.find("\n", lo, end)
+                if newline != -1:
+                    tag = content[lo:newline].strip().lower()
+                    if not tag or tag in _FENCE_LANGS:
+                        lo = newline + 1
+                else:
+                    # Single-line fence: drop a leading language token so
+                    # ```rust fn main(){}``` yields just the code
+                    space = lo
+                    while space < end and not content[space].isspace():
+                        space += 1
+                    if content[lo:space].lower() in _FENCE_LANGS:
+                        lo = space
+                code = _strip_span(content, lo, end)
                 if code:
                     return code
 
@@ -124,49 +191,69 @@ class LLM(ABC):
         batch_dir = os.path.join(self.base_dir, "batches", model)
         if not os.path.exists(batch_dir):
             return None
-        entries = (os.path.join(batch_dir, fn) for fn in os.listdir(batch_dir))
-        files = [f for f in entries if os.path.isfile(f)]
-        files.sort(key=os.path.getctime)
-        if files:
-            latest_file = files[-1]
-            return os.path.splitext(os.path.basename(latest_file))[0]
+        # Single O(n) max over scandir entries (stat results come cached)
+        # instead of two stats per file plus a sort
+        with os.scandir(batch_dir) as entries:
+            latest = max(
+                (e for e in entries if e.is_file()),
+                key=lambda e: e.stat().st_ctime,
+                default=None,
+            )
+        if latest:
+            return os.path.splitext(latest.name)[0]
         return None
 
 
 class Instructions:
     instructions = []
+    _rendered: dict[type, str] = {}
 
     def get_instructions(self) -> str:
-        instruction_list = ""
-        for i in self.instructions:
-            instruction_list += f"- {i}\n"
-        return instruction_list
+        # instructions is a class attribute, so render once per subclass
+        cached = Instructions._rendered.get(type(self))
+        if cached is None:
+            cached = "".join(f"- {i}\n" for i in self.instructions)
+            Instructions._rendered[type(self)] = cached
+        return cached
 
 
 class Task:
     def __init__(self, scenario: Scenario) -> None:
         self.scenario = scenario
+        self._task_text: str | None = None
 
     def get_task(self) -> str:
-        task = (
+        # The same example tasks feed every scenario's prompt, so render
+        # (json.dumps included) only once per instance
+        if self._task_text is None:
+            self._task_text = self._render_task()
+        return self._task_text
+
+    def _render_task(self) -> str:
+        # Append parts and join once instead of growing the accumulator
+        parts = [
             f"## NAME: {self.scenario.name}\n"
             f"## IMPLEMENTATION: {self.scenario.implementation}\n"
             f"## DESCRIPTION: <DESCRIPTION>{self.scenario.description}</DESCRIPTION>\n"
             f"## REQUIREMENTS:\n"
             f"<DEPENDENCIES>{json.dumps(self.scenario.dependencies)}</DEPENDENCIES>\n"
-        )
+        ]
         if self.scenario.options:
-            task += f"<BUILD OPTIONS>{json.dumps(self.scenario.options)}</BUILD OPTIONS>\n"
+            parts.append(f"<BUILD OPTIONS>{json.dumps(self.scenario.options)}</BUILD OPTIONS>\n")
         if self.scenario.implementation in Cs.aliases and self.scenario.packages:
             package_refs = [f"{p['name']}={p['version']}" for p in self.scenario.packages]
-            task += f"<PACKAGES>{json.dumps(package_refs)}</PACKAGES>\n"
+            parts.append(f"<PACKAGES>{json.dumps(package_refs)}</PACKAGES>\n")
         elif self.scenario.implementation in GraalVm.aliases + OpenJdk.aliases:
             if self.scenario.class_paths:
-                task += f"<CLASS PATHS>{json.dumps(self.scenario.class_paths)}</CLASS PATHS>\n"
+                parts.append(
+                    f"<CLASS PATHS>{json.dumps(self.scenario.class_paths)}</CLASS PATHS>\n"
+                )
             if self.scenario.roptions:
-                task += f"<RUNTIME OPTIONS>{json.dumps(self.scenario.roptions)}</RUNTIME OPTIONS>\n"
-        task += f"<HARDWARE>{self.scenario.hardware}</HARDWARE>\n"
-        return task
+                parts.append(
+                    f"<RUNTIME OPTIONS>{json.dumps(self.scenario.roptions)}</RUNTIME OPTIONS>\n"
+                )
+        parts.append(f"<HARDWARE>{self.scenario.hardware}</HARDWARE>\n")
+        return "".join(parts)
 
 
 class SignalInstructions(Instructions):
@@ -220,16 +307,16 @@ class RustInstructions(Instructions):
 
 
 class ExampleTask(Task):
-    def get_task(self) -> str:
-        task = super().get_task()
+    def _render_task(self) -> str:
+        task = super()._render_task()
         if self.scenario.code:
             task += f"## SOLUTION CODE: <code>{self.scenario.code}</code>\n"
         return task
 
 
 class ScenarioTask(Task):
-    def get_task(self) -> str:
-        task = super().get_task()
+    def _render_task(self) -> str:
+        task = super()._render_task()
         example_runs = []
         for test in itertools.islice(self.scenario.get_tests(), 2):
             example = (
@@ -257,22 +344,21 @@ class Prompt(ABC):
         self.instructions = instructions
 
     def build_prompt(self) -> str:
-        prompt = self._get_instructions()
-
-        prompt += (
+        parts = [
+            self._get_instructions(),
             "# OUTPUT FORMAT EXAMPLE:\n"
             "For a hello world program in C, your response should look exactly like this:\n"
-            '<code>#include <stdio.h>\nint main() {\n    printf("Hello World\\n");\n    return 0;\n}</code>\n\n'
-        )
+            '<code>#include <stdio.h>\nint main() {\n    printf("Hello World\\n");\n    return 0;\n}</code>\n\n',
+        ]
 
         if self.examples:
-            prompt += f"# EXAMPLES:\n{' '.join([ex.get_task() for ex in self.examples])}\n"
+            parts.append(f"# EXAMPLES:\n{' '.join(ex.get_task() for ex in self.examples)}\n")
 
-        prompt += (
+        parts.append(
             f"# TASK:\n{self.task.get_task()}\n"
             "GENERATING SOLUTIONS THAT DON'T ADHERE TO THESE STRICT RULES WILL LEAD TO TERMINATION"
         )
-        return prompt
+        return "".join(parts)
 
     def _get_instructions(self) -> str:
         return (
@@ -291,7 +377,6 @@ class Prompt(ABC):
         if not self.instructions:
             return ""
 
-        formatted = ""
-        for instruction_set in self.instructions:
-            formatted += instruction_set.get_instructions()
-        return formatted
+        return "".join(
+            instruction_set.get_instructions() for instruction_set in self.instructions
+        )
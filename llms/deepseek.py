@@ -1,19 +1,34 @@
-import openai
+import asyncio
 import os
 from .openai import OpenAILLM
 from utils import *
 
 
 class DeepSeekLLM(OpenAILLM):
-    chat_models = ["deepseek-chat"]
-    reasoning_models = ["deepseek-reasoner"]
+    chat_models = frozenset({"deepseek-chat"})
+    reasoning_models = frozenset({"deepseek-reasoner"})
 
     def __init__(self, base_dir: str) -> None:
+        # Same lazy-import treatment as the other providers
+        global openai, httpx
+        import openai
+        import httpx
+
         super().__init__(base_dir)
         try:
             self.client = openai.OpenAI(
                 api_key=os.environ["DEEPSEEK_API_KEY"], base_url="https://api.deepseek.com"
             )
+            # A keep-alive pool sized for single_many's fan-out; without it
+            # every concurrent call pays its own TCP + TLS handshake
+            self.aclient = openai.AsyncOpenAI(
+                api_key=os.environ["DEEPSEEK_API_KEY"],
+                base_url="https://api.deepseek.com",
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=64),
+                    timeout=60,
+                ),
+            )
         except openai.OpenAIError as ex:
             raise ProgramError(f"failed to initialize llm model - {ex}")
 
@@ -28,6 +43,17 @@ class DeepSeekLLM(OpenAILLM):
         except Exception as ex:
             raise ProgramError(f"unexpected error while generating response - {ex}")
 
+    async def _single_async(
+        self, model: str, message: str, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        async with semaphore:
+            response = await self._with_backoff(
+                lambda: self.aclient.chat.completions.create(
+                    model=model, messages=[{"role": "user", "content": message}]
+                )
+            )
+            return response.choices[0].message.content
+
     def batch(self, model: str, messages: list[str]) -> list[dict]:
         raise ProgramError(
             "DeepSeek doesn't support batching. Run --single at 16:30-00:30 UTC for half the price!"
@@ -1,34 +1,65 @@
+import asyncio
+
 from .base import LLM
+from utils import *
 
 
 class OllamaLLM(LLM):
+    def __init__(self, base_dir: str) -> None:
+        # Same lazy-import treatment as the hosted providers
+        global ollama
+        import ollama
+
+        super().__init__(base_dir)
+        self.aclient = ollama.AsyncClient()
+        self._available: set[str] | None = None
+
+    async def _single_async(
+        self, model: str, message: str, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        async with semaphore:
+            response = await self.aclient.generate(model=model, prompt=message)
+            return response.response
+
     def single(self, model: str, message: str) -> str | None:
-        return None
+        try:
+            return asyncio.run(self._single_async(model, message, asyncio.Semaphore(1)))
+        except (ollama.ResponseError, ConnectionError) as ex:
+            raise ProgramError(f"failed while generating response - {ex}")
+        except Exception as ex:
+            raise ProgramError(f"unexpected error while generating response - {ex}")
+
+    def single_many(
+        self, model: str, messages: list[str], concurrency: int = 4
+    ) -> list[str | None]:
+        # Local inference is compute-bound, so the cap stays conservative
+
+        async def gather() -> list[str | None]:
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(self._single_async(model, msg, semaphore) for msg in messages)
+            )
+
+        try:
+            return list(asyncio.run(gather()))
+        except (ollama.ResponseError, ConnectionError) as ex:
+            raise ProgramError(f"failed while generating responses - {ex}")
+        except Exception as ex:
+            raise ProgramError(f"unexpected error while generating responses - {ex}")
 
     def batch(self, model: str, messages: list[str]) -> list[dict]:
+        print_warning("Ollama doesn't support batch operations")
         return []
 
     def fetch(self, model: str) -> int:
+        print_warning("Ollama doesn't support batch operations")
         return 0
 
     def available(self) -> set[str]:
-        return set()
-
-    # def generate_ollama(self, model: str, context: str, task: str) -> str | None:
-    #     import ollama
-
-    #     llm_available = False
-
-    #     for _, ms in ollama.list():
-    #         for m in ms:
-    #             if model == m.model:
-    #                 llm_available = True
-
-    #     if not llm_available:
-    #         raise ProgramError(f"{model} not available")
-
-    #     try:
-    #         response = ollama.generate(model=model, prompt=context + task)
-    #         return response.response
-    #     except (ollama.ResponseError, ConnectionError) as ex:
-    #         raise ProgramError(f"failed while generating ollama reponse using model {model} - {ex}")
+        # Cached per instance so the model list isn't refetched per prompt
+        if self._available is None:
+            try:
+                self._available = {m.model for m in ollama.list().models}
+            except (ollama.ResponseError, ConnectionError) as ex:
+                raise ProgramError(f"failed while checking model availability - {ex}")
+        return self._available
@@ -1,23 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
-import openai
+import asyncio
 import json
+import time
 import os
 
-from scenario import Scenario
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .base import LLM
 from utils import *
 
+# orjson parses the batch output lines a few times faster than the stdlib
+# and takes the raw bytes as-is, so no per-line decode either
+_loads = orjson.loads if orjson else json.loads
+
+# How many times a rate-limited call is retried before the error surfaces
+_MAX_RETRIES = 3
+
 
 class OpenAILLM(LLM):
-    chat_models = ["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o", "gpt-4o-mini"]
-    reasoning_models = ["o1", "o1-mini", "o3", "o3-mini", "o4-mini"]
+    chat_models = frozenset({"gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o", "gpt-4o-mini"})
+    reasoning_models = frozenset({"o1", "o1-mini", "o3", "o3-mini", "o4-mini"})
 
     REASONING_EFFORT = "medium"
 
     def __init__(self, base_dir: str) -> None:
+        # Imported lazily so unused providers don't slow down startup; the
+        # global keeps the module-level openai.* references below working
+        global openai
+        import openai
+
         super().__init__(base_dir)
         try:
             self.client = openai.OpenAI()
+            self.aclient = openai.AsyncOpenAI()
         except openai.OpenAIError as ex:
             raise ProgramError(f"failed to initialize llm model - {ex}")
 
@@ -59,8 +78,69 @@ class OpenAILLM(LLM):
         except Exception as ex:
             raise ProgramError(f"unexpected error while generating response - {ex}")
 
-    def _create_batch_request(self, model: str, message: str) -> dict[str, Any]:
-        if model in self.reasoning_models:
+    async def _with_backoff(self, request):
+        # Retries rate-limited calls with exponential backoff; together with
+        # the semaphore in single_many this keeps a fan-out inside tier
+        # limits instead of hard-failing on the first 429
+        for attempt in range(_MAX_RETRIES):
+            try:
+                return await request()
+            except openai.RateLimitError:
+                if attempt == _MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2**attempt)
+
+    async def _single_async(
+        self, model: str, message: str, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        async with semaphore:
+            config = self._get_model_config(model)
+
+            if model in self.reasoning_models:
+                response = await self._with_backoff(
+                    lambda: self.aclient.responses.create(
+                        model=model,
+                        reasoning=config["reasoning"],
+                        max_output_tokens=config["max_output_tokens"],
+                        input=[{"role": "user", "content": message}],
+                    )
+                )
+                return response.output_text
+            else:
+                response = await self._with_backoff(
+                    lambda: self.aclient.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": message}],
+                        temperature=config["temperature"],
+                        max_completion_tokens=config["max_completion_tokens"],
+                    )
+                )
+                return response.choices[0].message.content
+
+    def single_many(
+        self, model: str, messages: list[str], concurrency: int = 16
+    ) -> list[str | None]:
+        # N prompts cost ~N/concurrency round trips instead of N serial ones
+
+        async def gather() -> list[str | None]:
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(self._single_async(model, msg, semaphore) for msg in messages)
+            )
+
+        try:
+            return list(asyncio.run(gather()))
+        except openai.OpenAIError as ex:
+            raise ProgramError(f"failed while generating responses - {ex}")
+        except Exception as ex:
+            raise ProgramError(f"unexpected error while generating responses - {ex}")
+
+    def _create_batch_request(
+        self, model: str, message: str, is_reasoning: bool, endpoint: str
+    ) -> dict[str, Any]:
+        # The reasoning flag and endpoint are identical for every message in
+        # a batch, so the caller computes them once and passes them in
+        if is_reasoning:
             body = {
                 "model": model,
                 "input": [{"role": "user", "content": message}],
@@ -75,8 +155,6 @@ class OpenAILLM(LLM):
                 "max_completion_tokens": self.DEFAULT_MAX_TOKENS,
             }
 
-        endpoint = "/v1/responses" if model in self.reasoning_models else "/v1/chat/completions"
-
         return {
             "custom_id": self.hash_from_message(message),
             "method": "POST",
@@ -97,17 +175,45 @@ class OpenAILLM(LLM):
                 return []
 
         try:
-            requests = [self._create_batch_request(model, msg) for msg in messages]
+            is_reasoning = model in self.reasoning_models
+            endpoint = "/v1/responses" if is_reasoning else "/v1/chat/completions"
+
+            # Request construction is dominated by hashing the prompt, and
+            # hashlib releases the GIL, so large batches spread that work
+            # across cores; small ones aren't worth the pool
+            if len(messages) < 32:
+                requests = [
+                    self._create_batch_request(model, msg, is_reasoning, endpoint)
+                    for msg in messages
+                ]
+            else:
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                    requests = list(
+                        pool.map(
+                            lambda msg: self._create_batch_request(
+                                model, msg, is_reasoning, endpoint
+                            ),
+                            messages,
+                        )
+                    )
 
             batch_path = self.save_batch(model, requests, "batch")
 
             with open(batch_path, "rb") as batch_file:
                 batch_file_obj = self.client.files.create(file=batch_file, purpose="batch")
 
-            endpoint = "/v1/responses" if model in self.reasoning_models else "/v1/chat/completions"
-            batch = self.client.batches.create(
-                input_file_id=batch_file_obj.id, endpoint=endpoint, completion_window="24h"
-            )
+            for attempt in range(_MAX_RETRIES):
+                try:
+                    batch = self.client.batches.create(
+                        input_file_id=batch_file_obj.id,
+                        endpoint=endpoint,
+                        completion_window="24h",
+                    )
+                    break
+                except openai.RateLimitError:
+                    if attempt == _MAX_RETRIES - 1:
+                        raise
+                    time.sleep(2**attempt)
 
             new_batch_path = batch_path.replace("batch.jsonl", f"{batch.id}.jsonl")
             os.rename(batch_path, new_batch_path)
@@ -127,13 +233,15 @@ class OpenAILLM(LLM):
         except openai.OpenAIError as ex:
             return "failed"
 
-    def _process_batch_response_line(self, line: str, model: str) -> str | None:
+    def _process_batch_response_line(
+        self, line: bytes | str, model: str, index: dict[str, str]
+    ) -> str | None:
         if not line.strip():
             return None
 
         try:
-            response = json.loads(line)
-        except json.JSONDecodeError as ex:
+            response = _loads(line)
+        except ValueError as ex:
             return None
 
         custom_id = response.get("custom_id")
@@ -141,7 +249,7 @@ class OpenAILLM(LLM):
             print_warning("batch response missing custom_id")
             return None
 
-        scenario = self._find_scenario_by_id(model, custom_id)
+        scenario = self._find_scenario_by_id(index, custom_id)
         if not scenario:
             print_warning(f"no scenario found for custom_id: {custom_id}")
             return None
@@ -182,30 +290,13 @@ class OpenAILLM(LLM):
         scenario_path = self.save_code(model, scenario, custom_id, code)
         return scenario_path
 
-    def _find_scenario_by_id(self, model: str, custom_id: str) -> Scenario | None:
-        scenarios_dir = os.path.join(self.base_dir, "scenarios", model)
-
-        if not os.path.exists(scenarios_dir):
-            return None
-
-        for dirpath, _, filenames in os.walk(scenarios_dir):
-            for filename in filenames:
-                if custom_id in filename:
-                    scenario_path = os.path.join(dirpath, filename)
-                    try:
-                        return Scenario.from_yaml(scenario_path)
-                    except Exception as ex:
-                        print(f"failed while loading scenario from {scenario_path}: {ex}")
-                        continue
-        return None
-
     def _handle_batch_error(self, batch_info) -> None:
         if not batch_info.error_file_id:
             raise ProgramError("batch failed with no error file available")
 
         try:
             error_response = self.client.files.content(batch_info.error_file_id)
-            error_data = json.loads(error_response.content)
+            error_data = _loads(error_response.content)
             error_message = (
                 error_data.get("response", {})
                 .get("body", {})
@@ -213,7 +304,7 @@ class OpenAILLM(LLM):
                 .get("message", "Unknown error")
             )
             raise ProgramError(f"batch processing failed - {error_message}")
-        except json.JSONDecodeError:
+        except ValueError:
             raise ProgramError("batch failed with unparseable error response")
 
     def fetch(self, model: str) -> int:
@@ -233,14 +324,19 @@ class OpenAILLM(LLM):
                 self._handle_batch_error(batch_info)
                 return 0
 
-            responses = self.client.files.content(batch_info.output_file_id)
+            index = self._build_scenario_index(model)
             fetched = 0
 
-            for line in responses.content.splitlines():
-                scenario_path = self._process_batch_response_line(line.decode("utf-8"), model)
-                if scenario_path:
-                    print_success(f"saved {scenario_path}")
-                    fetched += 1
+            # Stream the output file line by line instead of materialising
+            # the whole download (and a second copy from splitlines) in memory
+            with self.client.files.with_streaming_response.content(
+                batch_info.output_file_id
+            ) as responses:
+                for line in responses.iter_lines():
+                    scenario_path = self._process_batch_response_line(line, model, index)
+                    if scenario_path:
+                        print_success(f"saved {scenario_path}")
+                        fetched += 1
 
             self.remove_batch(model, batch_id)
             self.client.files.delete(batch_info.output_file_id)
@@ -255,12 +351,14 @@ class OpenAILLM(LLM):
 
     def available(self) -> set[str]:
         try:
+            # Each page folds in as one set union; the models endpoint has no
+            # page-size knob, so the SDK's cursor pagination is as few round
+            # trips as it gets
             available = set()
             response = self.client.models.list()
 
             while True:
-                for model in response.data:
-                    available.add(model.id)
+                available |= {model.id for model in response.data}
 
                 if not response.has_next_page():
                     break
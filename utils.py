@@ -1,7 +1,11 @@
-from datetime import datetime, timezone
+from collections import deque
+from functools import lru_cache
+from copy import deepcopy
 from typing import Any
-from glob import glob
+from glob import glob, has_magic
 import subprocess
+import shlex
+import time
 import os
 
 import yaml
@@ -13,6 +17,13 @@ def str_presenter(dumper, data):
 
 yaml.add_representer(str, str_presenter)
 
+# libyaml parses several times faster than the pure-Python loader; same
+# fallback shape as scenario.py uses
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.Dumper)
+
+yaml.add_representer(str, str_presenter, Dumper=_YAML_DUMPER)
+
 
 class ProgramError(Exception):
     def __init__(self, failed: str | None = None, ex: Exception | None = None, *args) -> None:
@@ -34,6 +45,7 @@ class ProgramError(Exception):
         return f"{err_msg}."
 
 
+@lru_cache(maxsize=1)
 def get_requested_perf_events() -> list[str]:
     requested_events = os.getenv("PERF_EVENTS", "").split(",")
     requested_events = [event.strip() for event in requested_events if event.strip()]
@@ -41,18 +53,33 @@ def get_requested_perf_events() -> list[str]:
 
 
 def remove_files_if_exist(path) -> None:
-    files = glob(path)
+    # Plain paths skip the directory scan glob would do; either way the
+    # exists-then-remove race collapses into unlink with the error ignored
+    files = [path] if not has_magic(path) else glob(path)
     for file in files:
-        if os.path.exists(file):
-            os.remove(file)
+        try:
+            os.unlink(file)
+        except FileNotFoundError:
+            pass
 
 
+@lru_cache(maxsize=None)
 def all_subclasses(cls):
-    return cls.__subclasses__() + [g for s in cls.__subclasses__() for g in all_subclasses(s)]
+    # The class tree is fixed once imports complete, so the walk runs at
+    # most once per base; anything loading classes dynamically can call
+    # all_subclasses.cache_clear()
+    found = []
+    queue = deque([cls])
+    while queue:
+        for sub in queue.popleft().__subclasses__():
+            found.append(sub)
+            queue.append(sub)
+    return found
 
 
 def format_time(timestamp: float) -> str:
-    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%d-%m-%Y %H:%M:%S UTC")
+    # gmtime/strftime stay in C; no datetime instance or tzinfo needed
+    return time.strftime("%d-%m-%Y %H:%M:%S UTC", time.gmtime(timestamp))
 
 
 def elapsed_time(seconds: float) -> str:
@@ -62,29 +89,63 @@ def elapsed_time(seconds: float) -> str:
 
 
 def filter_existing_yamls(yaml_paths: list[str]) -> list[str]:
-    existing_paths = []
+    # The extension check is pure string work, so it runs first and spares
+    # any filesystem traffic for paths that can't qualify. Candidates are
+    # then grouped per directory: one scandir replaces a stat per sibling
+    # once a directory holds a handful of them
+    by_dir: dict[str, set[str]] = {}
     for path in yaml_paths:
-        if os.path.exists(path) and is_yaml(path):
-            existing_paths.append(path)
-    return existing_paths
+        if is_yaml(path):
+            head, tail = os.path.split(path)
+            by_dir.setdefault(head, set()).add(tail)
+
+    existing: set[str] = set()
+    for directory, names in by_dir.items():
+        if len(names) < 4:
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    os.stat(path)
+                except OSError:
+                    continue
+                existing.add(path)
+        else:
+            try:
+                with os.scandir(directory or ".") as entries:
+                    for entry in entries:
+                        if entry.name in names:
+                            existing.add(os.path.join(directory, entry.name))
+            except OSError:
+                continue
+
+    return [path for path in yaml_paths if path in existing]
 
 
 def is_yaml(path: str) -> bool:
-    filename = os.path.basename(path)
-    split = os.path.splitext(filename)
-    if len(split) < 2:
-        return False
-    ext = os.path.splitext(path)[1].lower()
-    return ext in [".yaml", ".yml"]
+    # Single tuple-endswith instead of basename/splitext allocations; the
+    # basename guard only runs on matches and keeps bare dotfiles like
+    # ".yaml" excluded, as splitext did
+    lowered = path.lower()
+    return lowered.endswith((".yaml", ".yml")) and os.path.basename(lowered) not in (
+        ".yaml",
+        ".yml",
+    )
 
 
 def write_file(data: str | bytes, path: str) -> None:
+    # Most writes are a single short payload, so skip the buffered file
+    # object (same treatment as read_int_sysfs); the loop handles partial
+    # writes for anything large
+    if isinstance(data, str):
+        data = data.encode()
     try:
-        with open(path, "wb") as file:
-            if isinstance(data, str):
-                file.write(data.encode())
-            else:
-                file.write(data)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
     except OSError as ex:
         raise ProgramError("failed while writing file", ex)
 
@@ -98,6 +159,37 @@ def write_file_sudo(data: str | bytes, path: str) -> None:
         raise ProgramError("failed while writing file with superuser priviledges", ex)
 
 
+def write_files_sudo(writes: list[tuple[str | bytes, str]]) -> None:
+    # One sudo fork/exec for the whole batch instead of one per file
+    if not writes:
+        return
+
+    # set -e so the batch stops at the first failed write instead of only
+    # surfacing the last command's exit status through check=True
+    script = "set -e\n" + "\n".join(
+        f"printf %s {shlex.quote(data.decode() if isinstance(data, bytes) else data)}"
+        f" > {shlex.quote(path)}"
+        for data, path in writes
+    )
+    try:
+        subprocess.run(["sudo", "sh", "-c", script], check=True)
+    except subprocess.CalledProcessError as ex:
+        raise ProgramError("failed while writing files with superuser priviledges", ex)
+
+
+def read_int_sysfs(path: str) -> int:
+    # sysfs integers are tiny; a single raw read avoids the buffered file
+    # object, codec and context-manager layers
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as ex:
+        raise ProgramError(f"file {path} doesn't exist", ex)
+    try:
+        return int(os.read(fd, 32))
+    finally:
+        os.close(fd)
+
+
 def read_file(path: str) -> str:
     if not os.path.exists(path):
         raise ProgramError(f"file {path} doesn't exist")
@@ -109,53 +201,89 @@ def read_file(path: str) -> str:
         raise ProgramError("failed while reading file", ex)
 
 
-def tail_file(path: str, n: int = 10, block_size: int = 1024) -> str:
+def tail_file(path: str, n: int = 10, block_size: int = 65536) -> str:
+    # 64KiB blocks cut the pread count on long-line logs; peak memory still
+    # scales with the n lines kept, not the block size
     if n <= 0 or not os.path.exists(path):
         return ""
 
-    with open(path, "rb") as f:
-        f.seek(0, os.SEEK_END)
-        pos = f.tell()
-        buf = bytearray()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        pos = os.fstat(fd).st_size
+        chunks: list[bytes] = []
         nl_seen = 0
 
         while pos > 0 and nl_seen < n + 1:
             read_size = min(block_size, pos)
             pos -= read_size
-            f.seek(pos)
-            chunk = f.read(read_size)
-            buf[:0] = chunk
+            chunk = os.pread(fd, read_size, pos)
+            chunks.append(chunk)
             nl_seen += chunk.count(b"\n")
 
-        lines = buf.split(b"\n")[-n:]
-        return b"\n".join(lines).decode(errors="replace")
+        # Appending and joining once is linear; prepending into a bytearray
+        # re-copied the whole accumulated tail on every block
+        buf = b"".join(reversed(chunks))
+
+        # Walk back over the last n newlines with C-level rfind instead of
+        # splitting the whole buffer into throwaway line objects
+        cut = len(buf)
+        for _ in range(n):
+            cut = buf.rfind(b"\n", 0, cut)
+            if cut < 0:
+                return buf.decode(errors="replace")
+        return buf[cut + 1 :].decode(errors="replace")
+    finally:
+        os.close(fd)
+
+
+@lru_cache(maxsize=100)
+def _cached_load_yaml(path: str, mtime_ns: int, size: int) -> Any:
+    # Keyed on mtime and size so edits invalidate the entry while repeat
+    # loads of the same config skip the open and parse entirely
+    with open(path, "rb") as file:
+        return yaml.load(file, Loader=_YAML_LOADER)
 
 
 def load_yaml(path: str) -> Any:
     try:
-        with open(path, "rb") as file:
-            return yaml.safe_load(file)
+        st = os.stat(path)
+        # Callers may mutate the result, so hand out a copy of the cached doc
+        return deepcopy(_cached_load_yaml(path, st.st_mtime_ns, st.st_size))
     except Exception as ex:
         raise ProgramError(f"failed while loading yaml", ex)
 
 
+load_yaml.cache_clear = _cached_load_yaml.cache_clear
+
+
 def ensure_dir_exists(path: str) -> None:
-    if os.path.isdir(path) and not os.path.exists(path):
-        os.makedirs(path)
+    os.makedirs(path, exist_ok=True)
+
+
+# Bound once so per-line progress printing concatenates constants instead
+# of re-parsing the same format strings
+_BOLD = "\033[1m"
+_RESET = "\033[0m"
 
 
 def bold(text: str) -> str:
-    return f"\033[1m{text}\033[0m"
+    return _BOLD + text + _RESET
 
 
 def colored(text: str, color_code: str = "36") -> str:
-    return f"\033[{color_code}m{text}\033[0m"
+    return "\033[" + color_code + "m" + text + _RESET
+
+
+@lru_cache(maxsize=64)
+def _bold_label(label: str) -> str:
+    # The label set is a handful of fixed headers, so each is styled once
+    return bold(label)
 
 
 def fmt(label: str, value: str, value_width: int = 10, label_width: int = 12) -> str:
     if len(value) > value_width:
         value = value[: value_width - 1] + "…"
-    label = bold(label)
+    label = _bold_label(label)
     return f"{label:<{label_width}} {value:<{value_width}}"
 
 
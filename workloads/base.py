@@ -4,6 +4,11 @@ import os
 
 class Workload:
     DEPENDENCIES = []
+    registry: dict[str, type["Workload"]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Workload.registry[cls.__name__.lower()] = cls
 
     def __init__(self) -> None:
         self.process = None